@@ -1,45 +1,87 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from cachetools import TTLCache
 import os
+import json
+import logging
+import asyncio
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
 # Import auth and database modules
 from auth.auth_handler import AuthHandler
-# from auth.models import User, UserCreate, UserLogin, Token
-from auth.models import *
+from auth.models import (
+    User,
+    UserCreate,
+    UserLogin,
+    Token,
+    UserResponse,
+    ResetPasswordRequest,
+    ResetPasswordConfirm,
+    ResetPasswordResponse,
+)
 from auth.database import get_db, create_tables
-from sqlalchemy.orm import Session
+from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import RAG system
 import sys
 sys.path.append('./RAG')
 from RAG.chains import chain_with_message_history
 
-app = FastAPI(title="RAG System with Authentication", version="1.0.0")
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "8"))
+
+# Bounded pool for blocking RAG chain calls so long LLM requests don't tie up the event loop
+llm_pool = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+# Caps chain calls across /query and /query/stream; streams never run in llm_pool
+llm_slots = asyncio.Semaphore(LLM_WORKERS)
+
+# Create database tables on startup
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await create_tables()
+    yield
+    llm_pool.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(title="RAG System with Authentication", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
+# Explicit origins (comma-separated) let browsers honour credentials and cache preflights
+allowed_origins = [
+    origin.strip()
+    for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:8501").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=allowed_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,
 )
 
 # Initialize auth handler
 auth_handler = AuthHandler()
 security = HTTPBearer()
 
-# Create database tables on startup
-@app.on_event("startup")
-async def startup_event():
-    create_tables()
+# Short-lived snapshots of authenticated users (user_id -> SimpleNamespace)
+# so hot sessions skip the per-request SELECT
+_user_cache = TTLCache(maxsize=5000, ttl=60)
 
 # Pydantic models for requests
 class QueryRequest(BaseModel):
@@ -51,7 +93,7 @@ class QueryResponse(BaseModel):
     session_id: str
 
 # Authentication dependency
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
     token = credentials.credentials
     user_id = auth_handler.decode_token(token)
     if not user_id:
@@ -61,29 +103,44 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    cached_user = _user_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
+    
+    user_snapshot = SimpleNamespace(
+        id=user.id,
+        email=user.email,
+        username=user.username,
+        created_at=user.created_at
+    )
+    _user_cache[user_id] = user_snapshot
+    return user_snapshot
 
 # Auth endpoints
 @app.post("/signup", response_model=Token)
-async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
-    # Check if user already exists by email
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
+    # Check if email or username is already taken in a single round-trip
+    result = await db.execute(
+        select(User.email, User.username)
+        .where(or_(User.email == user_data.email, User.username == user_data.username))
+        .limit(1)
+    )
+    existing_user = result.first()
     if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Check if username already exists
-    existing_username = db.query(User).filter(User.username == user_data.username).first()
-    if existing_username:
+        if existing_user.email == user_data.email:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
@@ -91,7 +148,7 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     
     try:
         # Create new user
-        hashed_password = auth_handler.get_password_hash(user_data.password)
+        hashed_password = await auth_handler.get_password_hash(user_data.password)
         new_user = User(
             email=user_data.email,
             username=user_data.username,
@@ -99,25 +156,33 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         # Generate token
         access_token = auth_handler.encode_token(new_user.id)
-        return {"access_token": access_token, "token_type": "bearer"}
+        return {"access_token": access_token, "token_type": "bearer", "profile": UserResponse.model_validate(new_user)}
     
+    except IntegrityError:
+        # A concurrent signup claimed the email or username after our check
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email or username already registered"
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create user account"
         )
 
 @app.post("/signin", response_model=Token)
-async def signin(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def signin(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     # Find user by email
-    user = db.query(User).filter(User.email == user_credentials.email).first()
-    if not user or not auth_handler.verify_password(user_credentials.password, user.hashed_password):
+    result = await db.execute(select(User).where(User.email == user_credentials.email))
+    user = result.scalar_one_or_none()
+    if not user or not await auth_handler.verify_password(user_credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -125,18 +190,19 @@ async def signin(user_credentials: UserLogin, db: Session = Depends(get_db)):
     
     # Generate token
     access_token = auth_handler.encode_token(user.id)
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "token_type": "bearer", "profile": UserResponse.model_validate(user)}
 
 @app.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Alias for signin endpoint"""
     return await signin(user_credentials, db)
 
 @app.post("/forgot-password", response_model=ResetPasswordResponse)
-async def forgot_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def forgot_password(request: ResetPasswordRequest, db: AsyncSession = Depends(get_db)):
     """Initiate password reset process"""
     # Check if user exists
-    user = db.query(User).filter(User.email == request.email).first()
+    result = await db.execute(select(User).where(User.email == request.email))
+    user = result.scalar_one_or_none()
     if not user:
         # Don't reveal if email exists or not for security
         return ResetPasswordResponse(
@@ -154,11 +220,12 @@ async def forgot_password(request: ResetPasswordRequest, db: Session = Depends(g
     )
 
 @app.post("/reset-password", response_model=ResetPasswordResponse)
-async def reset_password(request: ResetPasswordConfirm, db: Session = Depends(get_db)):
+async def reset_password(request: ResetPasswordConfirm, db: AsyncSession = Depends(get_db)):
     """Reset password using reset code"""
     try:
         # Find user by email
-        user = db.query(User).filter(User.email == request.email).first()
+        result = await db.execute(select(User).where(User.email == request.email))
+        user = result.scalar_one_or_none()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -169,16 +236,17 @@ async def reset_password(request: ResetPasswordConfirm, db: Session = Depends(ge
         if auth_handler.reset_password_with_code(request.email, request.reset_code):
             try:
                 # Hash new password and update user
-                new_hashed_password = auth_handler.get_password_hash(request.new_password)
+                new_hashed_password = await auth_handler.get_password_hash(request.new_password)
                 user.hashed_password = new_hashed_password
-                db.commit()
+                await db.commit()
+                _user_cache.pop(user.id, None)
                 
                 return ResetPasswordResponse(
                     message="Password reset successfully"
                 )
             except Exception as e:
-                db.rollback()
-                print(f"Database error: {str(e)}")  # Debug logging
+                await db.rollback()
+                logger.exception("Database error during password reset")
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail=f"Failed to reset password: {str(e)}"
@@ -191,7 +259,7 @@ async def reset_password(request: ResetPasswordConfirm, db: Session = Depends(ge
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")  # Debug logging
+        logger.exception("Unexpected error during password reset")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Unexpected error: {str(e)}"
@@ -207,10 +275,16 @@ async def query_rag(
         # Use user-specific session ID
         session_id = f"{current_user.id}_{query_request.session_id}"
         
-        response = chain_with_message_history.invoke(
-            {"question": query_request.question},
-            config={"configurable": {"session_id": session_id}},
-        )
+        loop = asyncio.get_running_loop()
+        async with llm_slots:
+            response = await loop.run_in_executor(
+                llm_pool,
+                partial(
+                    chain_with_message_history.invoke,
+                    {"question": query_request.question},
+                    config={"configurable": {"session_id": session_id}},
+                ),
+            )
         
         return QueryResponse(
             answer=response,
@@ -222,6 +296,37 @@ async def query_rag(
             detail=f"Error processing query: {str(e)}"
         )
 
+async def token_stream(question: str, session_id: str):
+    """Yield RAG answer chunks as server-sent events"""
+    try:
+        # Held for the whole stream; a client disconnect cancels the generator and frees it
+        async with llm_slots:
+            async for chunk in chain_with_message_history.astream(
+                {"question": question},
+                config={"configurable": {"session_id": session_id}},
+            ):
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        yield f"event: error\ndata: {json.dumps({'detail': f'Error processing query: {str(e)}'})}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+# Protected streaming RAG endpoint
+@app.post("/query/stream")
+async def query_rag_stream(
+    query_request: QueryRequest,
+    current_user: User = Depends(get_current_user)
+):
+    # Use user-specific session ID
+    session_id = f"{current_user.id}_{query_request.session_id}"
+    
+    return StreamingResponse(
+        token_stream(query_request.question, session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # User profile endpoint
 @app.get("/profile")
 async def get_profile(current_user: User = Depends(get_current_user)):
@@ -239,4 +344,16 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Reset codes live in process memory, so scaling out is opt-in
+    workers = int(os.getenv("WORKERS", "1"))
+    uvicorn.run(
+        # Extra workers need an import string; a single one serves this app object
+        # rather than importing the module again and rebuilding the RAG chain
+        "app:app" if workers > 1 else app,
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=workers,
+        # "auto" picks uvloop and httptools when they are installed
+        loop="auto",
+        http="auto",
+    )
@@ -1,24 +1,80 @@
 import string
 import secrets
-from jose import jwt
-from datetime import datetime, timedelta
+import hashlib
+import hmac
+import threading
+import asyncio
+import time
+import jwt
+from cachetools import TTLCache
 import bcrypt
-from typing import Optional, Dict
+from typing import Optional
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# JWT settings resolved once at import so the token hot path uses plain globals
+# Use a secret key from environment or default
+_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-production")
+_SECRET = _SECRET_KEY.encode("utf-8")
+_ALGORITHM = "HS256"
+_ALGOS = [_ALGORITHM]
+_DECODE_OPTIONS = {"verify_aud": False}
+_ACCESS_TOKEN_EXPIRE_MINUTES = 30
+_EXP_SECONDS = _ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+# Short-lived cache of successfully decoded tokens -> user_id
+_decode_cache = TTLCache(maxsize=10000, ttl=5)
+_decode_lock = threading.Lock()
+
+def _encode_token(user_id: int) -> str:
+    """Create a JWT token"""
+    now = int(time.time())
+    payload = {
+        "user_id": user_id,
+        "exp": now + _EXP_SECONDS,
+        "iat": now
+    }
+    return jwt.encode(payload, _SECRET, algorithm=_ALGORITHM)
+
+def _decode_token(token: str) -> Optional[int]:
+    """Decode a JWT token and return user_id"""
+    key = hashlib.sha256(token.encode()).digest()[:16]
+    with _decode_lock:
+        user_id = _decode_cache.get(key)
+    if user_id is not None:
+        return user_id
+    
+    try:
+        payload = jwt.decode(token, _SECRET, algorithms=_ALGOS, options=_DECODE_OPTIONS)
+        user_id = payload.get("user_id")
+        # Only cache successful validations so bad tokens are always re-checked
+        if user_id is not None:
+            with _decode_lock:
+                _decode_cache[key] = user_id
+        return user_id
+    except jwt.ExpiredSignatureError:
+        return None
+    except jwt.InvalidTokenError:
+        return None
+
 class AuthHandler:
     def __init__(self):
-        # Use a secret key from environment or default
-        self.secret_key = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-production")
-        self.algorithm = "HS256"
-        self.access_token_expire_minutes = 30
+        self.secret_key = _SECRET_KEY
+        self.algorithm = _ALGORITHM
+        self.access_token_expire_minutes = _ACCESS_TOKEN_EXPIRE_MINUTES
+        self.bcrypt_rounds = int(os.getenv("BCRYPT_ROUNDS", "12"))
         # Add a simple in-memory store for reset codes (for mock implementation)
-        self.reset_codes: Dict[str, str] = {}  # email -> reset_code
+        # Codes expire after 15 minutes so abandoned reset flows don't pile up
+        self.reset_codes: TTLCache = TTLCache(maxsize=10000, ttl=900)  # email -> reset_code
+        self._reset_lock = threading.RLock()
+        # Short-lived cache of successful password checks, keyed by
+        # (HMAC of password, digest of stored hash) -> True
+        self._verify_cache = TTLCache(maxsize=2048, ttl=30)
+        self._cache_lock = threading.Lock()
     
-    def get_password_hash(self, password: str) -> str:
+    async def get_password_hash(self, password: str) -> str:
         """Hash a password using bcrypt"""
         # Ensure password is a string and strip any whitespace
         password = str(password).strip()
@@ -30,14 +86,15 @@ class AuthHandler:
         if len(password_bytes) > 72:
             password_bytes = password_bytes[:72]
         
-        # Generate salt and hash
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password_bytes, salt)
+        # Generate salt and hash off the event loop
+        salt = bcrypt.gensalt(rounds=self.bcrypt_rounds)
+        loop = asyncio.get_running_loop()
+        hashed = await loop.run_in_executor(None, bcrypt.hashpw, password_bytes, salt)
         
         # Return as string
         return hashed.decode('utf-8')
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash using bcrypt"""
         # Ensure password is a string and strip any whitespace
         plain_password = str(plain_password).strip()
@@ -53,28 +110,31 @@ class AuthHandler:
         if isinstance(hashed_password, str):
             hashed_password = hashed_password.encode('utf-8')
         
-        # Verify password
-        return bcrypt.checkpw(password_bytes, hashed_password)
+        # Skip bcrypt for a recently verified password/hash pair
+        key = (
+            hmac.new(_SECRET, password_bytes, hashlib.sha256).digest(),
+            hashlib.sha256(hashed_password).digest(),
+        )
+        with self._cache_lock:
+            if self._verify_cache.get(key):
+                return True
+        
+        # Verify password off the event loop
+        loop = asyncio.get_running_loop()
+        is_valid = await loop.run_in_executor(None, bcrypt.checkpw, password_bytes, hashed_password)
+        # Only cache matches so failed attempts always pay the full bcrypt cost
+        if is_valid:
+            with self._cache_lock:
+                self._verify_cache[key] = True
+        return is_valid
     
     def encode_token(self, user_id: int) -> str:
         """Create a JWT token"""
-        payload = {
-            "user_id": user_id,
-            "exp": datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes),
-            "iat": datetime.utcnow()
-        }
-        return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        return _encode_token(user_id)
     
     def decode_token(self, token: str) -> Optional[int]:
         """Decode a JWT token and return user_id"""
-        try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            user_id = payload.get("user_id")
-            return user_id
-        except jwt.ExpiredSignatureError:
-            return None
-        except jwt.InvalidTokenError:
-            return None
+        return _decode_token(token)
     
     def refresh_token(self, token: str) -> Optional[str]:
         """Refresh an existing token"""
@@ -91,7 +151,8 @@ class AuthHandler:
     def initiate_password_reset(self, email: str) -> str:
         """Initiate password reset process - returns reset code for mock implementation"""
         reset_code = self.generate_reset_code()
-        self.reset_codes[email] = reset_code
+        with self._reset_lock:
+            self.reset_codes[email] = reset_code
         
         # In a real implementation, you would:
         # 1. Send email with reset code
@@ -102,15 +163,18 @@ class AuthHandler:
     
     def verify_reset_code(self, email: str, reset_code: str) -> bool:
         """Verify if the reset code is valid for the given email"""
-        stored_code = self.reset_codes.get(email)
-        if stored_code and stored_code == reset_code:
+        with self._reset_lock:
+            stored_code = self.reset_codes.get(email)
+        # Constant-time compare so response timing doesn't leak matching digits
+        if stored_code and hmac.compare_digest(stored_code.encode('utf-8'), str(reset_code).encode('utf-8')):
             return True
         return False
     
     def reset_password_with_code(self, email: str, reset_code: str) -> bool:
         """Verify reset code and remove it if valid"""
-        if self.verify_reset_code(email, reset_code):
-            # Remove the used reset code
-            del self.reset_codes[email]
-            return True
+        with self._reset_lock:
+            if self.verify_reset_code(email, reset_code):
+                # Remove the used reset code
+                self.reset_codes.pop(email, None)
+                return True
         return False
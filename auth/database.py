@@ -1,26 +1,38 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import DBAPIError
 from auth.models import Base
 import os
 
 # Database configuration
-DATABASE_URL = "sqlite:///./auth.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./auth.db")
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Only needed for SQLite
+# Explicit pool limits so bursts of auth traffic queue instead of failing,
+# and stale connections are dropped before use. The pool class is explicit because
+# older aiosqlite dialects default to NullPool, which rejects the sizing arguments
+engine = create_async_engine(
+    DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=3600,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
-def create_tables():
-    """Create database tables"""
-    Base.metadata.create_all(bind=engine)
+async def create_tables():
+    """Create any missing database tables"""
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    except DBAPIError as e:
+        # Another worker booting at the same time created the table first
+        if "already exists" not in str(e.orig):
+            raise
 
-def get_db():
+async def get_db():
     """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
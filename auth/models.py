@@ -40,6 +40,7 @@ class UserResponse(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    profile: Optional[UserResponse] = None
 
 class TokenData(BaseModel):
     user_id: Optional[int] = None
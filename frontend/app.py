@@ -1,40 +1,81 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import httpx
+import asyncio
+import orjson
+import collections
+import time
+import os
 from typing import Optional
 
 # Configuration
 API_BASE_URL = "http://localhost:8000"
+REQUEST_TIMEOUT = (3, 60)  # (connect, read) seconds; RAG answers can take a while
+ANSWER_CACHE_TTL = 120  # seconds a repeated question is answered from memory
+ANSWER_CACHE_MAX_ENTRIES = 64
+ENABLE_RESET = os.getenv("RAG_ENABLE_PW_RESET", "1") == "1"
+TOKEN_COOKIE = "rag_token"
 
 # Initialize session state
-if "authenticated" not in st.session_state:
-    st.session_state.authenticated = False
-if "token" not in st.session_state:
-    st.session_state.token = None
-if "user_info" not in st.session_state:
-    st.session_state.user_info = None
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+# The script re-executes on every rerun, so these objects are fresh per new session
+_DEFAULTS = {
+    "authenticated": False,
+    # Set on logout (or when the cookie's token is rejected) so the token cookie
+    # the browser sent when this session connected isn't trusted again
+    "logged_out": False,
+    "token": None,
+    "user_info": None,
+    # Ring buffer keeping only the last 10 conversations
+    "chat_history": collections.deque(maxlen=10),
+    # question -> (timestamp, answer); per session, so answers never cross users
+    "answer_cache": {},
+    # Forgot password flow state
+    "reset_step": 1,
+    "reset_email": "",
+    "reset_code": "",
+}
+for key, value in _DEFAULTS.items():
+    st.session_state.setdefault(key, value)
+
+@st.cache_resource
+def _adapter() -> HTTPAdapter:
+    """Connection pool shared by all browser sessions for keep-alive reuse"""
+    return HTTPAdapter(pool_connections=10, pool_maxsize=20)
 
-def make_request(endpoint: str, method: str = "GET", data: dict = None, auth_required: bool = False) -> Optional[dict]:
+def _session() -> requests.Session:
+    """Per-browser-session HTTP session carrying that user's default headers"""
+    if "http_session" not in st.session_state:
+        session = requests.Session()
+        session.mount("http://", _adapter())
+        session.mount("https://", _adapter())
+        session.headers.update({"Content-Type": "application/json"})
+        st.session_state.http_session = session
+    return st.session_state.http_session
+
+def make_request(endpoint: str, method: str = "GET", data: dict = None) -> Optional[dict]:
     """Make API request with error handling"""
     url = f"{API_BASE_URL}{endpoint}"
-    headers = {"Content-Type": "application/json"}
-    
-    if auth_required and st.session_state.token:
-        headers["Authorization"] = f"Bearer {st.session_state.token}"
     
     try:
         if method == "POST":
-            response = requests.post(url, json=data, headers=headers)
+            # Session headers already set Content-Type: application/json
+            response = _session().post(url, data=orjson.dumps(data), timeout=REQUEST_TIMEOUT)
         else:
-            response = requests.get(url, headers=headers)
+            response = _session().get(url, timeout=REQUEST_TIMEOUT)
         
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Error: {response.status_code} - {response.json().get('detail', 'Unknown error')}")
-            return None
+        if response.ok:
+            return orjson.loads(response.content)
+        
+        # Error bodies may be HTML or truncated, so only trust JSON when it parses
+        detail = response.text[:500] or "Unknown error"
+        try:
+            detail = orjson.loads(response.content).get("detail", detail)
+        except (ValueError, AttributeError):
+            pass
+        st.error(f"Error: {response.status_code} - {detail}")
+        return None
     except requests.exceptions.ConnectionError:
         st.error("Cannot connect to API. Make sure the FastAPI server is running on http://localhost:8000")
         return None
@@ -42,6 +83,71 @@ def make_request(endpoint: str, method: str = "GET", data: dict = None, auth_req
         st.error(f"Request failed: {str(e)}")
         return None
 
+@st.cache_data(ttl=30, show_spinner=False)
+def _check_health() -> bool:
+    """Probe the API at most once every 30 seconds instead of on every rerun"""
+    try:
+        # A 200 is all we need, so don't bother parsing the body
+        return _session().get(f"{API_BASE_URL}/health", timeout=(3, 10)).status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_profile(token: str) -> Optional[dict]:
+    """Fetch the user profile once per token and reuse it across reruns"""
+    headers = {"Authorization": f"Bearer {token}"}
+    try:
+        response = _session().get(f"{API_BASE_URL}/profile", headers=headers, timeout=(3, 10))
+    except requests.exceptions.RequestException:
+        return None
+    return orjson.loads(response.content) if response.ok else None
+
+def _sync_token_cookie():
+    """Mirror the login state into the browser's token cookie"""
+    if st.session_state.token:
+        cookie = f"{TOKEN_COOKIE}={st.session_state.token}; path=/; SameSite=Strict"
+    elif st.session_state.logged_out:
+        cookie = f"{TOKEN_COOKIE}=; path=/; max-age=0; SameSite=Strict"
+    else:
+        return
+    # components.html renders a same-origin iframe, so its script can write the page's cookies.
+    # The iframe is only reloaded, re-running the script, when the cookie value changes.
+    script = (
+        f"parent.document.cookie = {orjson.dumps(cookie).decode()}"
+        " + (parent.location.protocol === 'https:' ? '; Secure' : '');"
+    )
+    components.html(f"<script>{script}</script>", height=0)
+
+def _forget_token():
+    """Stop trusting the token cookie and have the browser drop it"""
+    st.session_state.logged_out = True
+
+async def _warmup(token: str) -> tuple:
+    """Check API health and fetch the profile concurrently; returns (healthy, profile)"""
+    async with httpx.AsyncClient(base_url=API_BASE_URL, timeout=httpx.Timeout(10.0, connect=3.0)) as client:
+        health, profile = await asyncio.gather(
+            client.get("/health"),
+            client.get("/profile", headers={"Authorization": f"Bearer {token}"}),
+            return_exceptions=True,
+        )
+    healthy = isinstance(health, httpx.Response) and health.status_code == 200
+    if isinstance(profile, httpx.Response) and profile.is_success:
+        return healthy, orjson.loads(profile.content)
+    return healthy, None
+
+def restore_session(token: str, profile: Optional[dict]) -> bool:
+    """Rehydrate login state from the token cookie, if it is still valid"""
+    if not profile:
+        # Expired or revoked token; don't keep retrying it
+        _forget_token()
+        return False
+    
+    st.session_state.token = token
+    _session().headers["Authorization"] = f"Bearer {token}"
+    st.session_state.authenticated = True
+    st.session_state.user_info = profile
+    return True
+
 def login_user(email: str, password: str) -> bool:
     """Login user and store token"""
     data = {"email": email, "password": password}
@@ -49,12 +155,17 @@ def login_user(email: str, password: str) -> bool:
     
     if response:
         st.session_state.token = response["access_token"]
+        _session().headers["Authorization"] = f"Bearer {st.session_state.token}"
         st.session_state.authenticated = True
+        st.session_state.logged_out = False
         
-        # Get user profile
-        profile = make_request("/profile", auth_required=True)
+        # Use the profile embedded in the auth response, fetching it only if absent
+        profile = response.get("profile") or _fetch_profile(st.session_state.token)
         if profile:
             st.session_state.user_info = profile
+        else:
+            # Don't keep a failed fetch cached for the whole TTL
+            _fetch_profile.clear()
         
         return True
     return False
@@ -66,12 +177,17 @@ def signup_user(email: str, username: str, password: str) -> bool:
     
     if response:
         st.session_state.token = response["access_token"]
+        _session().headers["Authorization"] = f"Bearer {st.session_state.token}"
         st.session_state.authenticated = True
+        st.session_state.logged_out = False
         
-        # Get user profile
-        profile = make_request("/profile", auth_required=True)
+        # Use the profile embedded in the auth response, fetching it only if absent
+        profile = response.get("profile") or _fetch_profile(st.session_state.token)
         if profile:
             st.session_state.user_info = profile
+        else:
+            # Don't keep a failed fetch cached for the whole TTL
+            _fetch_profile.clear()
         
         return True
     return False
@@ -80,8 +196,12 @@ def logout_user():
     """Logout user and clear session"""
     st.session_state.authenticated = False
     st.session_state.token = None
+    _session().headers.pop("Authorization", None)
     st.session_state.user_info = None
-    st.session_state.chat_history = []
+    st.session_state.chat_history.clear()
+    st.session_state.answer_cache.clear()
+    _fetch_profile.clear()
+    _forget_token()
 
 def forgot_password(email: str) -> Optional[str]:
     """Request password reset code"""
@@ -99,216 +219,303 @@ def reset_password(email: str, reset_code: str, new_password: str) -> bool:
     
     return response is not None
 
-def query_rag(question: str) -> Optional[str]:
-    """Query the RAG system"""
+async def _query_stream(question: str, token: str, placeholder) -> Optional[str]:
+    """Stream the RAG answer from /query/stream into the placeholder as it arrives"""
     data = {"question": question, "session_id": "streamlit_session"}
-    response = make_request("/query", "POST", data, auth_required=True)
+    headers = {"Authorization": f"Bearer {token}"}
+    answer = ""
+    event = "message"
     
-    if response:
-        return response["answer"]
+    async with httpx.AsyncClient(base_url=API_BASE_URL, timeout=httpx.Timeout(60.0, connect=3.0)) as client:
+        async with client.stream("POST", "/query/stream", json=data, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                try:
+                    detail = orjson.loads(response.content).get("detail", "Unknown error")
+                except ValueError:
+                    detail = response.text[:200]
+                st.error(f"Error: {response.status_code} - {detail}")
+                return None
+            
+            # Minimal server-sent events parser: "event:" sets the type, "data:" carries JSON
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    payload = orjson.loads(line[len("data:"):])
+                    if event == "error":
+                        st.error(payload.get("detail", "Unknown error"))
+                        return None
+                    if event == "done":
+                        break
+                    answer += payload.get("token", "")
+                    placeholder.markdown(answer)
+                elif not line:
+                    event = "message"
+    
+    return answer or None
+
+def _cached_answer(question: str) -> Optional[str]:
+    """Return a recent answer to the same question, if any"""
+    entry = st.session_state.answer_cache.get(question)
+    if entry and time.time() - entry[0] < ANSWER_CACHE_TTL:
+        return entry[1]
     return None
 
-def main():
-    st.set_page_config(
-        page_title="RAG System with Authentication",
-        layout="wide"
-    )
-    
-    st.title("RAG System with Authentication")
+def _cache_answer(question: str, answer: str):
+    """Remember an answer, evicting the oldest entry past the size limit"""
+    cache = st.session_state.answer_cache
+    cache.pop(question, None)
+    cache[question] = (time.time(), answer)
+    if len(cache) > ANSWER_CACHE_MAX_ENTRIES:
+        cache.pop(next(iter(cache)))
+
+def stream_query_rag(question: str, placeholder) -> Optional[str]:
+    """Query the RAG system, rendering the answer progressively"""
+    try:
+        return asyncio.run(_query_stream(question, st.session_state.token, placeholder))
+    except httpx.ConnectError:
+        st.error("Cannot connect to API. Make sure the FastAPI server is running on http://localhost:8000")
+        return None
+    except Exception as e:
+        st.error(f"Request failed: {str(e)}")
+        return None
+
+@st.fragment
+def chat_panel():
+    """Chat history and query form; reruns on its own instead of the whole page"""
+    st.subheader("Ask questions about company policies")
     
-    # Check API health
-    health = make_request("/health")
-    if not health:
-        st.error("API server is not responding. Please start the FastAPI server.")
-        st.stop()
+    # Display chat history
+    if st.session_state.chat_history:
+        st.subheader("Chat History")
+        for question, answer in st.session_state.chat_history:
+            with st.chat_message("user"):
+                st.write(question)
+            with st.chat_message("assistant"):
+                st.write(answer)
     
-    # Authentication section
-    if not st.session_state.authenticated:
-        st.header("Authentication Required")
-        
-        tab1, tab2, tab3 = st.tabs(["Login", "Sign Up", "Forgot Password"])
-        
-        with tab1:
-            st.subheader("Login to your account")
-            with st.form("login_form"):
-                email = st.text_input("Email")
-                password = st.text_input("Password", type="password")
-                submit_login = st.form_submit_button("Login")
-                
-                if submit_login:
-                    if email and password:
-                        if login_user(email, password):
-                            st.success("Login successful!")
-                            st.rerun()
-                        else:
-                            st.error("Login failed. Please check your credentials.")
-                    else:
-                        st.error("Please fill in all fields.")
+    # Query input
+    with st.form("query_form"):
+        question = st.text_area(
+            "Enter your question:",
+            placeholder="e.g., What is the company policy on remote work?",
+            height=100
+        )
+        submit_query = st.form_submit_button("Ask Question")
         
-        with tab2:
-            st.subheader("Create a new account")
-            with st.form("signup_form"):
-                email = st.text_input("Email", key="signup_email")
-                username = st.text_input("Username")
-                password = st.text_input("Password", type="password", key="signup_password")
-                confirm_password = st.text_input("Confirm Password", type="password")
-                submit_signup = st.form_submit_button("Sign Up")
+        if submit_query and question.strip():
+            with st.chat_message("user"):
+                st.write(question.strip())
+            
+            # Display current answer as it streams in
+            with st.chat_message("assistant"):
+                answer_placeholder = st.empty()
+                # Repeated questions are served from memory instead of the LLM
+                answer = _cached_answer(question.strip())
+                if answer:
+                    answer_placeholder.markdown(answer)
+                else:
+                    answer_placeholder.markdown("_Processing your question..._")
+                    answer = stream_query_rag(question.strip(), answer_placeholder)
+            
+            if answer:
+                _cache_answer(question.strip(), answer)
+                st.success("Question processed successfully!")
                 
-                if submit_signup:
-                    if email and username and password and confirm_password:
-                        if password != confirm_password:
-                            st.error("Passwords do not match.")
-                        elif len(password) < 6:
-                            st.error("Password must be at least 6 characters long.")
-                        else:
-                            if signup_user(email, username, password):
-                                st.success("Account created successfully!")
-                                st.rerun()
-                            else:
-                                st.error("Sign up failed. Email might already be registered.")
+                # Add to chat history (oldest entry drops off past 10)
+                st.session_state.chat_history.append((question.strip(), answer))
+            else:
+                answer_placeholder.empty()
+                st.error("Failed to get answer. Please try again.")
+    
+    # Clear chat history button
+    if st.session_state.chat_history:
+        if st.button("Clear Chat History"):
+            st.session_state.chat_history.clear()
+            st.rerun(scope="fragment")
+
+def render_reset_tab():
+    """Two-step forgot password flow"""
+    st.subheader("Reset your password")
+    
+    if st.session_state.reset_step == 1:
+        # Step 1: Request reset code
+        st.write("Enter your email address to receive a reset code:")
+        with st.form("forgot_password_form"):
+            email = st.text_input("Email", key="forgot_email")
+            submit_forgot = st.form_submit_button("Send Reset Code")
+            
+            if submit_forgot:
+                if email:
+                    reset_code = forgot_password(email)
+                    if reset_code:
+                        st.session_state.reset_email = email
+                        st.session_state.reset_code = reset_code
+                        st.session_state.reset_step = 2
+                        st.success(f"Reset code sent! Your code is: **{reset_code}**")
+                        st.info("In a real application, this code would be sent to your email.")
+                        st.rerun(scope="fragment")
                     else:
-                        st.error("Please fill in all fields.")
+                        st.error("Failed to send reset code. Please check your email address.")
+                else:
+                    st.error("Please enter your email address.")
+    
+    elif st.session_state.reset_step == 2:
+        # Step 2: Enter reset code and new password
+        st.write(f"Reset code has been sent to: **{st.session_state.reset_email}**")
+        st.info(f"Your reset code is: **{st.session_state.reset_code}**")
         
-        with tab3:
-            st.subheader("Reset your password")
+        with st.form("reset_password_form"):
+            reset_code_input = st.text_input("Enter Reset Code")
+            new_password = st.text_input("New Password", type="password", key="reset_new_password")
+            confirm_new_password = st.text_input("Confirm New Password", type="password", key="reset_confirm_password")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                submit_reset = st.form_submit_button("Reset Password")
+            with col2:
+                cancel_reset = st.form_submit_button("Cancel")
             
-            # Initialize session state for forgot password flow
-            if "reset_step" not in st.session_state:
+            if cancel_reset:
                 st.session_state.reset_step = 1
-            if "reset_email" not in st.session_state:
                 st.session_state.reset_email = ""
-            if "reset_code" not in st.session_state:
                 st.session_state.reset_code = ""
+                st.rerun(scope="fragment")
             
-            if st.session_state.reset_step == 1:
-                # Step 1: Request reset code
-                st.write("Enter your email address to receive a reset code:")
-                with st.form("forgot_password_form"):
-                    email = st.text_input("Email", key="forgot_email")
-                    submit_forgot = st.form_submit_button("Send Reset Code")
-                    
-                    if submit_forgot:
-                        if email:
-                            reset_code = forgot_password(email)
-                            if reset_code:
-                                st.session_state.reset_email = email
-                                st.session_state.reset_code = reset_code
-                                st.session_state.reset_step = 2
-                                st.success(f"Reset code sent! Your code is: **{reset_code}**")
-                                st.info("In a real application, this code would be sent to your email.")
-                                st.rerun()
-                            else:
-                                st.error("Failed to send reset code. Please check your email address.")
+            if submit_reset:
+                if reset_code_input and new_password and confirm_new_password:
+                    if new_password != confirm_new_password:
+                        st.error("Passwords do not match.")
+                    elif len(new_password) < 6:
+                        st.error("Password must be at least 6 characters long.")
+                    else:
+                        if reset_password(st.session_state.reset_email, reset_code_input, new_password):
+                            st.success("Password reset successfully! You can now login with your new password.")
+                            st.session_state.reset_step = 1
+                            st.session_state.reset_email = ""
+                            st.session_state.reset_code = ""
+                            st.rerun(scope="fragment")
                         else:
-                            st.error("Please enter your email address.")
+                            st.error("Invalid reset code or failed to reset password.")
+                else:
+                    st.error("Please fill in all fields.")
+
+@st.fragment
+def render_auth():
+    """Login, sign-up and password reset tabs; reruns on its own while unauthenticated"""
+    st.header("Authentication Required")
+    
+    tabs = st.tabs(["Login", "Sign Up"] + (["Forgot Password"] if ENABLE_RESET else []))
+    
+    with tabs[0]:
+        st.subheader("Login to your account")
+        with st.form("login_form"):
+            email = st.text_input("Email")
+            password = st.text_input("Password", type="password")
+            submit_login = st.form_submit_button("Login")
             
-            elif st.session_state.reset_step == 2:
-                # Step 2: Enter reset code and new password
-                st.write(f"Reset code has been sent to: **{st.session_state.reset_email}**")
-                st.info(f"Your reset code is: **{st.session_state.reset_code}**")
-                
-                with st.form("reset_password_form"):
-                    reset_code_input = st.text_input("Enter Reset Code")
-                    new_password = st.text_input("New Password", type="password", key="reset_new_password")
-                    confirm_new_password = st.text_input("Confirm New Password", type="password", key="reset_confirm_password")
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        submit_reset = st.form_submit_button("Reset Password")
-                    with col2:
-                        cancel_reset = st.form_submit_button("Cancel")
-                    
-                    if cancel_reset:
-                        st.session_state.reset_step = 1
-                        st.session_state.reset_email = ""
-                        st.session_state.reset_code = ""
+            if submit_login:
+                if email and password:
+                    if login_user(email, password):
+                        st.success("Login successful!")
                         st.rerun()
-                    
-                    if submit_reset:
-                        if reset_code_input and new_password and confirm_new_password:
-                            if new_password != confirm_new_password:
-                                st.error("Passwords do not match.")
-                            elif len(new_password) < 6:
-                                st.error("Password must be at least 6 characters long.")
-                            else:
-                                if reset_password(st.session_state.reset_email, reset_code_input, new_password):
-                                    st.success("Password reset successfully! You can now login with your new password.")
-                                    st.session_state.reset_step = 1
-                                    st.session_state.reset_email = ""
-                                    st.session_state.reset_code = ""
-                                    st.rerun()
-                                else:
-                                    st.error("Invalid reset code or failed to reset password.")
-                        else:
-                            st.error("Please fill in all fields.")
+                    else:
+                        st.error("Login failed. Please check your credentials.")
+                else:
+                    st.error("Please fill in all fields.")
     
-    else:
-        # Main application for authenticated users
-        col1, col2 = st.columns([3, 1])
-        
-        with col1:
-            st.header("RAG Query System")
-        
-        with col2:
-            if st.session_state.user_info:
-                st.write(f"Welcome, {st.session_state.user_info['username']}")
-            if st.button("Logout"):
-                logout_user()
-                st.rerun()
-        
-        # Chat interface
-        st.subheader("Ask questions about company policies")
-        
-        # Display chat history
-        if st.session_state.chat_history:
-            st.subheader("Chat History")
-            for i, (question, answer) in enumerate(st.session_state.chat_history):
-                with st.expander(f"Q{i+1}: {question[:50]}..."):
-                    st.write(f"**Question:** {question}")
-                    st.write(f"**Answer:** {answer}")
-        
-        # Query input
-        with st.form("query_form"):
-            question = st.text_area(
-                "Enter your question:",
-                placeholder="e.g., What is the company policy on remote work?",
-                height=100
-            )
-            submit_query = st.form_submit_button("Ask Question")
+    with tabs[1]:
+        st.subheader("Create a new account")
+        with st.form("signup_form"):
+            email = st.text_input("Email", key="signup_email")
+            username = st.text_input("Username")
+            password = st.text_input("Password", type="password", key="signup_password")
+            confirm_password = st.text_input("Confirm Password", type="password")
+            submit_signup = st.form_submit_button("Sign Up")
             
-            if submit_query and question.strip():
-                with st.spinner("Processing your question..."):
-                    answer = query_rag(question.strip())
-                    
-                    if answer:
-                        st.success("Question processed successfully!")
-                        
-                        # Add to chat history
-                        st.session_state.chat_history.append((question.strip(), answer))
-                        
-                        # Display current answer
-                        st.subheader("Answer")
-                        st.write(answer)
-                        
-                        # Keep only last 10 conversations
-                        if len(st.session_state.chat_history) > 10:
-                            st.session_state.chat_history = st.session_state.chat_history[-10:]
+            if submit_signup:
+                if email and username and password and confirm_password:
+                    if password != confirm_password:
+                        st.error("Passwords do not match.")
+                    elif len(password) < 6:
+                        st.error("Password must be at least 6 characters long.")
                     else:
-                        st.error("Failed to get answer. Please try again.")
-        
-        # Clear chat history button
-        if st.session_state.chat_history:
-            if st.button("Clear Chat History"):
-                st.session_state.chat_history = []
-                st.rerun()
-        
-        # User profile section
-        with st.expander("User Profile"):
-            if st.session_state.user_info:
-                st.write(f"**User ID:** {st.session_state.user_info['id']}")
-                st.write(f"**Email:** {st.session_state.user_info['email']}")
-                st.write(f"**Username:** {st.session_state.user_info['username']}")
-                st.write(f"**Account Created:** {st.session_state.user_info['created_at']}")
+                        if signup_user(email, username, password):
+                            st.success("Account created successfully!")
+                            st.rerun()
+                        else:
+                            st.error("Sign up failed. Email might already be registered.")
+                else:
+                    st.error("Please fill in all fields.")
+    
+    if ENABLE_RESET:
+        with tabs[2]:
+            render_reset_tab()
+
+
+def render_app():
+    """Main application for authenticated users"""
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        st.header("RAG Query System")
+    
+    with col2:
+        if st.session_state.user_info:
+            st.write(f"Welcome, {st.session_state.user_info['username']}")
+        if st.button("Logout"):
+            logout_user()
+            st.rerun()
+    
+    # Chat interface
+    chat_panel()
+    
+    # User profile section
+    with st.expander("User Profile"):
+        if st.session_state.user_info:
+            st.write(f"**User ID:** {st.session_state.user_info['id']}")
+            st.write(f"**Email:** {st.session_state.user_info['email']}")
+            st.write(f"**Username:** {st.session_state.user_info['username']}")
+            st.write(f"**Account Created:** {st.session_state.user_info['created_at']}")
+
+def main():
+    # Sent on every run: each full rerun resets the browser tab's title and favicon
+    # until page config arrives again
+    st.set_page_config(
+        page_title="RAG System with Authentication",
+        layout="wide"
+    )
+    
+    st.title("RAG System with Authentication")
+    
+    # A token cookie on a fresh session means we need both health and profile,
+    # so fetch them in parallel instead of back to back
+    saved_token = None
+    if not st.session_state.authenticated and not st.session_state.logged_out:
+        # st.context.cookies holds the cookies the browser sent when this session connected
+        saved_token = st.context.cookies.get(TOKEN_COOKIE)
+    
+    # Check API health
+    if saved_token:
+        health, profile = asyncio.run(_warmup(saved_token))
+    else:
+        health, profile = _check_health(), None
+    if not health:
+        # Don't keep a failed probe cached, so a restarted server is picked up on the next rerun
+        _check_health.clear()
+        st.error("API server is not responding. Please start the FastAPI server.")
+        st.stop()
+    
+    if saved_token:
+        restore_session(saved_token, profile)
+    # Written from the final login state, so a login or logout is followed by its cookie update
+    _sync_token_cookie()
+    
+    if not st.session_state.authenticated:
+        render_auth()
+    else:
+        render_app()
 
 if __name__ == "__main__":
     main()
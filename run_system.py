@@ -2,35 +2,55 @@
 """
 Startup script to run both FastAPI backend and Streamlit frontend
 """
-import subprocess
+import asyncio
 import sys
-import time
 import os
-from threading import Thread
+import httpx
 
-def run_fastapi():
+HEALTH_URL = "http://localhost:8000/health"
+STARTUP_TIMEOUT = 60  # seconds to wait for the backend to become healthy
+
+async def run_fastapi() -> asyncio.subprocess.Process:
     """Run the FastAPI backend"""
     print("Starting FastAPI backend...")
-    try:
-        subprocess.run([sys.executable, "app.py"], check=True)
-    except KeyboardInterrupt:
-        print("\nFastAPI backend stopped.")
-    except Exception as e:
-        print(f"Error running FastAPI: {e}")
+    return await asyncio.create_subprocess_exec(sys.executable, "app.py")
 
-def run_streamlit():
+async def run_streamlit() -> asyncio.subprocess.Process:
     """Run the Streamlit frontend"""
     print("Starting Streamlit frontend...")
-    try:
-        # Change to frontend directory and run streamlit
-        os.chdir("frontend")
-        subprocess.run([sys.executable, "-m", "streamlit", "run", "app.py"], check=True)
-    except KeyboardInterrupt:
-        print("\nStreamlit frontend stopped.")
-    except Exception as e:
-        print(f"Error running Streamlit: {e}")
+    # Run streamlit from the frontend directory
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "streamlit", "run", "app.py", cwd="frontend"
+    )
+
+async def wait_for_backend(process: asyncio.subprocess.Process) -> bool:
+    """Poll the health endpoint until the backend answers or the timeout expires"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STARTUP_TIMEOUT
+    async with httpx.AsyncClient(timeout=0.5) as client:
+        while loop.time() < deadline:
+            if process.returncode is not None:
+                # Backend exited during startup
+                return False
+            try:
+                if (await client.get(HEALTH_URL)).status_code == 200:
+                    return True
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    return False
 
-def main():
+async def stop(process: asyncio.subprocess.Process):
+    """Terminate a child process, killing it if it doesn't exit promptly"""
+    if process.returncode is None:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+async def main():
     """Main function to run both services"""
     print("RAG System with Authentication - Startup Script")
     print("=" * 50)
@@ -50,18 +70,27 @@ def main():
     print("\nPress Ctrl+C to stop both services")
     print("-" * 50)
     
-    # Start FastAPI in a separate thread
-    fastapi_thread = Thread(target=run_fastapi, daemon=True)
-    fastapi_thread.start()
-    
-    # Wait a moment for FastAPI to start
-    time.sleep(3)
-    
-    # Start Streamlit (this will block until stopped)
+    processes = [await run_fastapi()]
     try:
-        run_streamlit()
-    except KeyboardInterrupt:
+        # Wait until FastAPI is actually serving requests
+        if not await wait_for_backend(processes[0]):
+            print(f"Error: FastAPI backend did not become healthy within {STARTUP_TIMEOUT} seconds.")
+            return
+        
+        processes.append(await run_streamlit())
+        
+        # Run until either service exits, then bring the other one down too
+        await asyncio.wait(
+            [asyncio.create_task(p.wait()) for p in processes],
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+    except asyncio.CancelledError:
         print("\nShutting down both services...")
+    finally:
+        await asyncio.gather(*(stop(p) for p in processes))
 
 if __name__ == "__main__":
-    main()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass